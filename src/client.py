@@ -3,178 +3,463 @@
 Enhanced CLI client for Arduino MCP Server with better debugging
 """
 import asyncio
+import functools
 import json
+import logging
 import sys
 import os
-from typing import Dict, Any, Optional
+import subprocess
+import threading
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from daemon import DEFAULT_SOCKET_PATH, log_path_for, open_private, prepare_socket_dir
+
+# Spawned for --persistent; found next to this file, not in the current directory
+_DAEMON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon.py")
+
+# Progress and lifecycle messages; command results are still printed directly
+log = logging.getLogger("mcp.client")
+
+# orjson is much faster and works on bytes directly; fall back to stdlib json.
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so handlers stay the same.
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+    _loads = json.loads
+
+# Static handshake frames, serialized once; only the request ID varies
+_INIT_TEMPLATE = (
+    b'{"jsonrpc":"2.0","id":%d,"method":"initialize","params":'
+    b'{"protocolVersion":"2024-11-05","capabilities":{"tools":{}},'
+    b'"clientInfo":{"name":"Arduino MCP Client","version":"1.0.0"}}}\n'
+)
+_INITIALIZED_NOTIF = b'{"jsonrpc":"2.0","method":"notifications/initialized"}\n'
+
+# tools/call frame: id, cached per-tool envelope, then the encoded arguments
+_TOOL_CALL_TEMPLATE = b'{"jsonrpc":"2.0","id":%d%s%s}}\n'
+
+# Piped commands that must not overlap other calls: they drive the LED (debug
+# toggles it too) or add turns to the server's shared Gemini chat
+_STATEFUL_SCRIPT_COMMANDS = frozenset({"led", "ask", "smart", "debug"})
+
+# JSON larger than this is decoded in a worker thread to keep the loop responsive
+_OFFLOAD_DECODE_SIZE = 32 * 1024
+
+# Notifications only wait for stdin to drain once this many bytes are queued
+_NOTIFY_HIGH_WATER = 64 * 1024
+
+# In-flight requests live in a slab indexed by (id & mask); must be a power of two
+_PENDING_SLOTS = 1024
+
+# Seconds to wait for a response before failing the request
+_RESPONSE_TIMEOUT = 10.0
+
+def _expire(fut: asyncio.Future):
+    """Timer callback failing a request still waiting for its response"""
+    if not fut.done():
+        fut.set_exception(asyncio.TimeoutError())
+
+# Only the tail of server stderr is kept for error reports
+_STDERR_LIMIT = 64 * 1024
+
+class MCPProtocol(asyncio.SubprocessProtocol, asyncio.Protocol):
+    """Protocol that feeds server output straight into the client's frame parser
+    
+    Works both for a spawned server (pipe callbacks) and for a persistent
+    daemon reached over a Unix socket (stream callbacks).
+    """
+    
+    def __init__(self, client: "ArduinoMCPClient"):
+        self.client = client
+        self.stdout_buf = bytearray()
+        self.stderr_buf = bytearray()
+        self.closed = asyncio.get_running_loop().create_future()
+        self._paused = False
+        self._drain_waiters: List[asyncio.Future] = []
+    
+    def connection_made(self, transport):
+        self.client._server_alive = True
+    
+    def pipe_data_received(self, fd: int, data: bytes):
+        if fd == 1:
+            self.data_received(data)
+        elif fd == 2:
+            self.stderr_buf.extend(data)
+            if len(self.stderr_buf) > _STDERR_LIMIT:
+                del self.stderr_buf[:-_STDERR_LIMIT]
+    
+    def pipe_connection_lost(self, fd: int, exc: Optional[Exception]):
+        if fd == 0:
+            self._wake_drain_waiters(ConnectionError("Server stdin closed"))
+        elif fd == 1:
+            self.client._fail_pending(ConnectionError("No response from server (connection lost)"))
+    
+    def data_received(self, data: bytes):
+        self.stdout_buf.extend(data)
+        self.client._dispatch_frames(self.stdout_buf)
+    
+    def process_exited(self):
+        self.client._server_alive = False
+        self.client._fail_pending(ConnectionError("No response from server (connection lost)"))
+        self._wake_drain_waiters(ConnectionError("Server process has died"))
+    
+    def connection_lost(self, exc: Optional[Exception]):
+        # Subprocess: the process has exited and all pipes are closed.
+        # Socket: the daemon connection is gone.
+        self.process_exited()
+        if not self.closed.done():
+            self.closed.set_result(None)
+    
+    def pause_writing(self):
+        self._paused = True
+    
+    def resume_writing(self):
+        self._paused = False
+        self._wake_drain_waiters(None)
+    
+    def _wake_drain_waiters(self, exc: Optional[Exception]):
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                if exc is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(exc)
+        self._drain_waiters.clear()
+    
+    async def drain(self):
+        """Wait until the stdin pipe accepts more data"""
+        if not self._paused:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
 
 class ArduinoMCPClient:
-    def __init__(self):
-        self.server_process = None
+    def __init__(self, socket_path: Optional[str] = None, main_path: Optional[str] = None):
+        self.socket_path = socket_path
+        # Already-checked server script path; None means look for ./main.py
+        self.main_path = main_path
+        self.server_transport: Optional[asyncio.BaseTransport] = None
+        self.server_protocol: Optional[MCPProtocol] = None
+        self._writer: Optional[asyncio.WriteTransport] = None
         self.request_id = 0
+        # Pending requests: parallel slot arrays, plus a dict for slot collisions
+        self._slot_mask = _PENDING_SLOTS - 1
+        self._slot_ids: List[int] = [0] * _PENDING_SLOTS
+        self._pending_slots: List[Optional[asyncio.Future]] = [None] * _PENDING_SLOTS
+        self._pending_overflow: Dict[Any, asyncio.Future] = {}
+        self._server_alive = False
+        self._tool_frame_cache: Dict[str, bytes] = {}
+        
+        # Interactive command dispatch table
+        self._cmds = {
+            "test": self.test_connection,
+            "debug": self.handle_debug_command,
+            "ping": self.handle_ping_command,
+            "led": self.handle_led_command,
+            "ir": self.handle_ir_command,
+            "status": self.handle_status_command,
+            "ask": self.handle_ask_command,
+            "analyze": self.handle_analyze_command,
+            "smart": self.handle_smart_command,
+            "tools": self.handle_tools_command,
+        }
     
     def get_next_id(self) -> int:
         """Get next request ID"""
-        self.request_id += 1
+        # Stay within 31 bits; IDs start at 1 again after wrapping
+        self.request_id = self.request_id % 0x7FFFFFFF + 1
         return self.request_id
     
     async def start_server(self):
         """Start the MCP server as subprocess with better error handling"""
         try:
-            print("🔄 Starting MCP server...")
+            log.info("🔄 Starting MCP server...")
             
-            # Check if main.py exists
-            if not os.path.exists("main.py"):
-                raise Exception("main.py not found in current directory")
+            # Check if main.py exists, unless the caller already resolved it
+            main_path = self.main_path
+            if main_path is None:
+                if not os.path.exists("main.py"):
+                    raise Exception("main.py not found in current directory")
+                main_path = "main.py"
             
-            # Start server with stderr capture
-            self.server_process = await asyncio.create_subprocess_exec(
-                sys.executable, "main.py",
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            print("📡 Server process started, waiting for initialization...")
-            
-            # Wait a bit for server to start
-            await asyncio.sleep(3)
-            
-            # Check if process is still running
-            if self.server_process.returncode is not None:
-                # Process has died, get the error
-                stdout, stderr = await self.server_process.communicate()
-                error_msg = stderr.decode() if stderr else "Unknown error"
-                stdout_msg = stdout.decode() if stdout else "No output"
+            if self.socket_path:
+                await self.connect_persistent_server(main_path)
+            else:
+                # Start server; the protocol receives stdout/stderr chunks directly
+                loop = asyncio.get_running_loop()
+                self.server_transport, self.server_protocol = await loop.subprocess_exec(
+                    lambda: MCPProtocol(self),
+                    sys.executable, main_path,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                self._writer = self.server_transport.get_pipe_transport(0)
                 
-                raise Exception(f"Server process died during startup.\nSTDERR: {error_msg}\nSTDOUT: {stdout_msg}")
+                log.info("📡 Server process started, waiting for initialization...")
             
-            # Try to initialize MCP connection
+            # Initialize MCP connection as soon as the server is ready
             await self.initialize_connection()
-            print("✅ MCP Server started and initialized successfully")
+            log.info("✅ MCP Server started and initialized successfully")
             
         except Exception as e:
-            print(f"❌ Failed to start server: {e}")
-            if self.server_process and self.server_process.returncode is None:
-                print("🔄 Attempting to read server output for debugging...")
-                try:
-                    # Try to read any available output
-                    stdout_data = b""
-                    stderr_data = b""
-                    
-                    # Non-blocking read attempt
-                    try:
-                        stdout_data = await asyncio.wait_for(
-                            self.server_process.stdout.read(1024), timeout=1.0
-                        )
-                    except asyncio.TimeoutError:
-                        pass
-                    
-                    try:
-                        stderr_data = await asyncio.wait_for(
-                            self.server_process.stderr.read(1024), timeout=1.0
-                        )
-                    except asyncio.TimeoutError:
-                        pass
-                    
-                    if stdout_data:
-                        print(f"📤 Server STDOUT: {stdout_data.decode()}")
-                    if stderr_data:
-                        print(f"📤 Server STDERR: {stderr_data.decode()}")
-                        
-                except Exception as debug_e:
-                    print(f"⚠️  Could not read server output: {debug_e}")
+            log.error(f"❌ Failed to start server: {e}")
+            if self.server_transport and not self.socket_path and self.server_transport.get_returncode() is None:
+                log.info("🔄 Attempting to read server output for debugging...")
+                stderr_data = bytes(self.server_protocol.stderr_buf[-1024:])
+                if stderr_data:
+                    log.warning(f"📤 Server STDERR: {stderr_data.decode(errors='replace')}")
             
             raise
     
+    async def connect_persistent_server(self, main_path: str):
+        """Connect to the shared daemon, spawning it first if it isn't running"""
+        loop = asyncio.get_running_loop()
+        
+        try:
+            self.server_transport, self.server_protocol = await loop.create_unix_connection(
+                lambda: MCPProtocol(self), self.socket_path
+            )
+            log.info(f"🔌 Connected to persistent MCP server at {self.socket_path}")
+        except (FileNotFoundError, ConnectionRefusedError, PermissionError):
+            # A socket we may not use is treated like no daemon at all
+            log.info("🔄 No persistent server running, starting daemon...")
+            
+            # New session so the daemon outlives this client; its stderr, and
+            # the server's, go to a log file next to the socket
+            prepare_socket_dir(self.socket_path)
+            daemon_log = open_private(log_path_for(self.socket_path), os.O_WRONLY | os.O_APPEND)
+            try:
+                subprocess.Popen(
+                    [sys.executable, _DAEMON_PATH, self.socket_path, os.path.abspath(main_path)],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=daemon_log,
+                    start_new_session=True
+                )
+            finally:
+                os.close(daemon_log)
+            
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                try:
+                    self.server_transport, self.server_protocol = await loop.create_unix_connection(
+                        lambda: MCPProtocol(self), self.socket_path
+                    )
+                    break
+                except (FileNotFoundError, ConnectionRefusedError, PermissionError):
+                    continue
+            else:
+                raise Exception(f"Persistent server did not come up at {self.socket_path}")
+            
+            log.info(f"📡 Persistent server started at {self.socket_path}, waiting for initialization...")
+        
+        self._writer = self.server_transport
+    
     async def initialize_connection(self):
         """Initialize MCP connection with handshake"""
         try:
-            print("🤝 Initializing MCP connection...")
+            log.info("🤝 Initializing MCP connection...")
             
             # Send initialize request
-            init_request = {
-                "jsonrpc": "2.0",
-                "id": self.get_next_id(),
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {
-                        "tools": {}
-                    },
-                    "clientInfo": {
-                        "name": "Arduino MCP Client",
-                        "version": "1.0.0"
-                    }
-                }
-            }
+            init_id = self.get_next_id()
+            init_frame = _INIT_TEMPLATE % init_id
+            
+            # Probe for readiness instead of sleeping a fixed time: the handshake
+            # completes as soon as the server answers, and a crash is noticed quickly
+            init_task = asyncio.ensure_future(self._send_frame(init_id, init_frame))
+            while True:
+                done, _ = await asyncio.wait({init_task}, timeout=0.1)
+                if done:
+                    break
+                if not self._server_alive:
+                    init_task.cancel()
+                    raise await self._startup_failure()
+            
+            try:
+                response = init_task.result()
+            except ConnectionError:
+                raise await self._startup_failure()
             
-            response = await self.send_raw_request(init_request)
             if "error" in response:
                 raise Exception(f"Initialization failed: {response['error']}")
             
-            print("📋 Initialize request successful")
+            log.info("📋 Initialize request successful")
             
             # Send initialized notification
-            initialized_notification = {
-                "jsonrpc": "2.0",
-                "method": "notifications/initialized"
-            }
-            
-            await self.send_notification(initialized_notification)
-            print("📢 Initialized notification sent")
+            await self._send_notification_frame(_INITIALIZED_NOTIF)
+            log.info("📢 Initialized notification sent")
             
         except Exception as e:
-            print(f"❌ MCP initialization failed: {e}")
+            log.error(f"❌ MCP initialization failed: {e}")
             raise
     
+    async def _startup_failure(self) -> Exception:
+        """Build an error from the output of a server that died during startup"""
+        if self.socket_path:
+            return Exception(f"Persistent server closed the connection during startup; see {log_path_for(self.socket_path)}")
+        
+        # Wait for the exit and the last stderr bytes to come through
+        try:
+            await asyncio.wait_for(asyncio.shield(self.server_protocol.closed), timeout=5.0)
+        except asyncio.TimeoutError:
+            pass
+        
+        stdout = bytes(self.server_protocol.stdout_buf)
+        stderr = bytes(self.server_protocol.stderr_buf)
+        error_msg = stderr.decode(errors="replace") if stderr else "Unknown error"
+        stdout_msg = stdout.decode(errors="replace") if stdout else "No output"
+        
+        return Exception(f"Server process died during startup.\nSTDERR: {error_msg}\nSTDOUT: {stdout_msg}")
+    
+    def _dispatch_frames(self, buf: bytearray):
+        """Split complete lines off the stdout buffer and dispatch each one"""
+        # Walk the buffer by index and compact once at the end, rather than
+        # shifting the remaining bytes down after every frame
+        start = 0
+        with memoryview(buf) as view:
+            while True:
+                end = buf.find(b"\n", start)
+                if end == -1:
+                    break
+                self._dispatch_frame(bytes(view[start:end]))
+                start = end + 1
+        
+        if start:
+            del buf[:start]
+    
+    def _add_pending(self, request_id: Any, fut: asyncio.Future):
+        """Register a request waiting for its response"""
+        # Only int IDs index the slots; string IDs from send_raw_request overflow
+        if type(request_id) is not int:
+            self._pending_overflow[request_id] = fut
+            return
+        
+        slot = request_id & self._slot_mask
+        if self._pending_slots[slot] is None:
+            self._slot_ids[slot] = request_id
+            self._pending_slots[slot] = fut
+        else:
+            self._pending_overflow[request_id] = fut
+    
+    def _take_pending(self, request_id: Any) -> Optional[asyncio.Future]:
+        """Remove and return the request waiting on this ID, if any"""
+        if type(request_id) is int:
+            slot = request_id & self._slot_mask
+            fut = self._pending_slots[slot]
+            if fut is not None and self._slot_ids[slot] == request_id:
+                self._pending_slots[slot] = None
+                return fut
+        return self._pending_overflow.pop(request_id, None) if self._pending_overflow else None
+    
+    def _fail_pending(self, exc: Exception):
+        """Fail anything still waiting so callers don't hang until timeout"""
+        waiting = [fut for fut in self._pending_slots if fut is not None]
+        waiting.extend(self._pending_overflow.values())
+        self._pending_slots = [None] * _PENDING_SLOTS
+        self._pending_overflow.clear()
+        
+        for fut in waiting:
+            if not fut.done():
+                fut.set_exception(exc)
+    
+    def _dispatch_frame(self, frame: bytes):
+        """Resolve the pending request matching a single response line"""
+        # The decoder skips surrounding whitespace itself, so no strip() copy
+        if not frame or frame.isspace():
+            return
+        
+        # Large AI responses are decoded off the event loop thread
+        if len(frame) > _OFFLOAD_DECODE_SIZE:
+            decoded = asyncio.get_running_loop().run_in_executor(None, _loads, frame)
+            decoded.add_done_callback(lambda f: self._on_frame_decoded(frame, f))
+            return
+        
+        try:
+            response = _loads(frame)
+        except json.JSONDecodeError as e:
+            log.warning(f"⚠️  Ignoring invalid JSON from server: {e}. Line was: {frame[:200]!r}")
+            return
+        
+        self._resolve_response(response)
+    
+    def _on_frame_decoded(self, frame: bytes, decoded: asyncio.Future):
+        """Finish dispatching a frame decoded in a worker thread"""
+        if decoded.cancelled():
+            return
+        
+        error = decoded.exception()
+        if isinstance(error, json.JSONDecodeError):
+            log.warning(f"⚠️  Ignoring invalid JSON from server: {error}. Line was: {frame[:200]!r}")
+        elif error is None:
+            self._resolve_response(decoded.result())
+    
+    def _resolve_response(self, response: Any):
+        """Hand a decoded response to its waiting request"""
+        if not isinstance(response, dict):
+            return
+        fut = self._take_pending(response.get("id"))
+        if fut and not fut.done():
+            fut.set_result(response)
+    
     async def send_raw_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Send raw JSON-RPC request to MCP server"""
-        if not self.server_process:
+        return await self._send_frame(request["id"], _dumps(request) + b"\n")
+    
+    async def _send_frame(self, request_id: Any, frame: bytes) -> Dict[str, Any]:
+        """Write a serialized request and wait for the response with its ID"""
+        if not self.server_transport:
             raise Exception("Server not started")
         
-        if self.server_process.returncode is not None:
+        if not self._server_alive:
             raise Exception("Server process has died")
         
-        request_json = json.dumps(request) + "\n"
+        # Register before writing so a fast response can't be missed
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._add_pending(request_id, fut)
         
         try:
-            self.server_process.stdin.write(request_json.encode())
-            await self.server_process.stdin.drain()
+            self._writer.write(frame)
+            await self.server_protocol.drain()
         except Exception as e:
+            self._take_pending(request_id)
             raise Exception(f"Failed to send request: {e}")
         
-        # Read response with timeout
+        # Wait for the protocol to deliver the matching response; a plain timer
+        # on the future is cheaper than wrapping the await in wait_for
+        timer = loop.call_later(_RESPONSE_TIMEOUT, _expire, fut)
         try:
-            response_line = await asyncio.wait_for(
-                self.server_process.stdout.readline(), timeout=10.0
-            )
+            return await fut
         except asyncio.TimeoutError:
             raise Exception("Server response timeout")
-        
-        if not response_line:
-            raise Exception("No response from server (connection lost)")
-        
-        try:
-            response = json.loads(response_line.decode().strip())
-            return response
-        except json.JSONDecodeError as e:
-            response_text = response_line.decode().strip()
-            raise Exception(f"Invalid JSON response: {e}. Response was: '{response_text}'")
+        finally:
+            timer.cancel()
+            self._take_pending(request_id)
     
     async def send_notification(self, notification: Dict[str, Any]):
         """Send notification (no response expected)"""
-        if not self.server_process:
+        await self._send_notification_frame(_dumps(notification) + b"\n")
+    
+    async def _send_notification_frame(self, frame: bytes):
+        """Write a serialized notification"""
+        if not self.server_transport:
             raise Exception("Server not started")
         
-        if self.server_process.returncode is not None:
+        if not self._server_alive:
             raise Exception("Server process has died")
         
-        notification_json = json.dumps(notification) + "\n"
-        
+        # No response is expected, so let notifications coalesce in the write
+        # buffer and only apply backpressure once it grows large
         try:
-            self.server_process.stdin.write(notification_json.encode())
-            await self.server_process.stdin.drain()
+            self._writer.write(frame)
+            if self._writer.get_write_buffer_size() > _NOTIFY_HIGH_WATER:
+                await self.server_protocol.drain()
         except Exception as e:
             raise Exception(f"Failed to send notification: {e}")
     
@@ -192,7 +477,7 @@ class ArduinoMCPClient:
     async def test_connection(self):
         """Test if server is responsive"""
         try:
-            print("🔍 Testing server connection...")
+            log.info("🔍 Testing server connection...")
             response = await self.send_request("tools/list")
             if "error" in response:
                 print(f"⚠️  Server responded with error: {response['error']}")
@@ -214,12 +499,21 @@ class ArduinoMCPClient:
     
     async def call_tool(self, name: str, arguments: Dict[str, Any] = None) -> Dict[str, Any]:
         """Call a specific tool"""
-        params = {
-            "name": name,
-            "arguments": arguments or {}
-        }
-        response = await self.send_request("tools/call", params)
+        # The envelope only depends on the tool name, so encode it once per tool
+        envelope = self._tool_frame_cache.get(name)
+        if envelope is None:
+            envelope = b',"method":"tools/call","params":{"name":' + _dumps(name) + b',"arguments":'
+            self._tool_frame_cache[name] = envelope
         
+        request_id = self.get_next_id()
+        # One bytes format builds the frame; the pipe transport would join
+        # separate chunks into a single buffer anyway
+        frame = _TOOL_CALL_TEMPLATE % (request_id, envelope, _dumps(arguments) if arguments else b"{}")
+        response = await self._send_frame(request_id, frame)
+        return await self.parse_tool_response(response)
+    
+    async def parse_tool_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the tool result from a tools/call response"""
         if "error" in response:
             return {"success": False, "error": response["error"]}
         
@@ -231,13 +525,41 @@ class ArduinoMCPClient:
             try:
                 # Try to parse JSON from the text content
                 text_content = content[0].get("text", "{}")
-                return json.loads(text_content)
+                if len(text_content) > _OFFLOAD_DECODE_SIZE:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(None, _loads, text_content)
+                return _loads(text_content)
             except json.JSONDecodeError:
                 # If not JSON, return raw text
                 return {"success": True, "content": text_content}
         
         return {"success": False, "error": "No content in response"}
     
+    async def _ainput(self, prompt: str) -> str:
+        """Read a line on a prompt thread so the event loop keeps servicing I/O"""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        
+        def deliver(result, error):
+            if fut.done():
+                return
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+        
+        def prompt_thread():
+            try:
+                line = input(prompt)
+            except BaseException as e:
+                loop.call_soon_threadsafe(deliver, None, e)
+            else:
+                loop.call_soon_threadsafe(deliver, line, None)
+        
+        # Daemon thread, so a pending prompt never blocks interpreter exit
+        threading.Thread(target=prompt_thread, daemon=True).start()
+        return await fut
+    
     async def interactive_session(self):
         """Run interactive CLI session"""
         print("🤖 Arduino + AI MCP Client")
@@ -248,45 +570,132 @@ class ArduinoMCPClient:
         if not await self.test_connection():
             print("⚠️  Warning: Server connection issues detected")
         
+        # Piped input: read every command up front and pipeline their calls
+        if not sys.stdin.isatty():
+            script = await asyncio.to_thread(sys.stdin.read)
+            await self.run_script(script.splitlines())
+            return
+        
         while True:
             try:
-                command = input("\n> ").strip().lower()
+                command = (await self._ainput("\n> ")).strip().lower()
                 
-                if command in ["quit", "exit", "q"]:
+                handler = self._cmds.get(command)
+                if handler:
+                    await handler()
+                elif command in ("quit", "exit", "q"):
                     break
                 elif command == "help":
                     self.show_help()
-                elif command == "test":
-                    await self.test_connection()
-                elif command == "debug":
-                    await self.handle_debug_command()
-                elif command == "ping":
-                    await self.handle_ping_command()
-                elif command == "led":
-                    await self.handle_led_command()
-                elif command == "ir":
-                    await self.handle_ir_command()
-                elif command == "status":
-                    await self.handle_status_command()
-                elif command == "ask":
-                    await self.handle_ask_command()
-                elif command == "analyze":
-                    await self.handle_analyze_command()
-                elif command == "smart":
-                    await self.handle_smart_command()
-                elif command == "tools":
-                    await self.handle_tools_command()
                 elif command == "":
                     continue  # Skip empty input
                 else:
                     print("❌ Unknown command. Type 'help' for available commands.")
             
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError, asyncio.CancelledError):
+                # Ctrl-C cancels the main task while the prompt thread waits
                 print("\n👋 Goodbye!")
                 break
             except Exception as e:
                 print(f"❌ Error: {e}")
     
+    def _script_tool_call(self, command: str, arg: str) -> Optional[Tuple[str, Optional[Dict[str, Any]], Callable[[Dict[str, Any]], None]]]:
+        """Map a scripted command to its single tool call and result printer
+        
+        Returns None for commands that need more than one call. Raises
+        ValueError when an inline argument is missing or invalid.
+        """
+        if command == "led":
+            state = arg.upper()
+            if state not in ["ON", "OFF"]:
+                raise ValueError("Invalid state. Use ON or OFF")
+            return "led_control", {"state": state}, functools.partial(self.show_led_result, state)
+        
+        if command == "ask":
+            if not arg:
+                raise ValueError("Please enter a question")
+            return "ask_ai", {"question": arg}, self.show_ask_result
+        
+        if command == "smart":
+            if not arg:
+                raise ValueError("Please describe the scenario")
+            return "smart_led_control", {"scenario": arg}, self.show_smart_result
+        
+        simple_calls = {
+            "ir": ("read_ir_sensor", self.show_ir_result),
+            "status": ("get_arduino_status", self.show_status_result),
+            "ping": ("test_arduino_communication", self.show_ping_result),
+            "debug": ("debug_arduino_raw", self.show_debug_result),
+        }
+        if command in simple_calls:
+            name, show = simple_calls[command]
+            return name, None, show
+        
+        return None
+    
+    async def run_script(self, lines: List[str]):
+        """Run piped commands, keeping consecutive read-only tool calls in flight together
+        
+        Commands that prompt take their input inline, e.g. "led ON" or
+        "ask what is an IR sensor?". Results are printed in input order.
+        """
+        in_flight = []  # (line, call task or None, printer)
+        
+        async def flush():
+            for line, task, show in in_flight:
+                print(f"\n> {line}")
+                try:
+                    show(await task if task else None)
+                except Exception as e:
+                    print(f"❌ Error: {e}")
+            in_flight.clear()
+        
+        for line in lines:
+            line = line.strip()
+            command, _, arg = line.partition(" ")
+            command = command.lower()
+            arg = arg.strip()
+            
+            if not command:
+                continue
+            if command in ("quit", "exit", "q"):
+                break
+            
+            try:
+                call = self._script_tool_call(command, arg)
+            except ValueError as e:
+                in_flight.append((line, None, lambda _, msg=str(e): print(f"❌ {msg}")))
+                continue
+            
+            if call:
+                name, arguments, show = call
+                # Calls that change state (the LED, the shared AI chat) run alone,
+                # after everything before them and before anything after them
+                stateful = command in _STATEFUL_SCRIPT_COMMANDS
+                if stateful:
+                    await flush()
+                in_flight.append((line, asyncio.ensure_future(self.call_tool(name, arguments)), show))
+                if stateful:
+                    await flush()
+                continue
+            
+            # Anything else runs on its own once earlier calls are printed
+            await flush()
+            print(f"\n> {line}")
+            try:
+                if command == "analyze":
+                    await self.handle_analyze_command(arg)
+                elif command == "help":
+                    self.show_help()
+                elif command in self._cmds:
+                    await self._cmds[command]()
+                else:
+                    print("❌ Unknown command. Type 'help' for available commands.")
+            except Exception as e:
+                print(f"❌ Error: {e}")
+        
+        await flush()
+    
     def show_help(self):
         """Show help message"""
         help_text = """
@@ -306,16 +715,21 @@ class ArduinoMCPClient:
         """
         print(help_text)
     
-    async def handle_led_command(self):
+    async def handle_led_command(self, state: Optional[str] = None):
         """Handle LED control command"""
-        state = input("💡 LED state (ON/OFF): ").strip().upper()
+        if state is None:
+            state = await self._ainput("💡 LED state (ON/OFF): ")
+        state = state.strip().upper()
         if state not in ["ON", "OFF"]:
             print("❌ Invalid state. Use ON or OFF")
             return
         
-        print(f"🔄 Setting LED to {state}...")
+        log.info(f"🔄 Setting LED to {state}...")
         result = await self.call_tool("led_control", {"state": state})
-        
+        self.show_led_result(state, result)
+    
+    def show_led_result(self, state: str, result: Dict[str, Any]):
+        """Print the result of an LED control call"""
         if result.get("success"):
             print(f"✅ LED set to {state}")
             if result.get("response"):
@@ -325,9 +739,12 @@ class ArduinoMCPClient:
     
     async def handle_ir_command(self):
         """Handle IR sensor reading"""
-        print("🔄 Reading IR sensor...")
+        log.info("🔄 Reading IR sensor...")
         result = await self.call_tool("read_ir_sensor")
-        
+        self.show_ir_result(result)
+    
+    def show_ir_result(self, result: Dict[str, Any]):
+        """Print the result of an IR sensor reading"""
         if result.get("success"):
             ir_value = result.get("ir_sensor_value")
             interpretation = result.get("interpretation")
@@ -337,32 +754,40 @@ class ArduinoMCPClient:
     
     async def handle_status_command(self):
         """Handle Arduino status check"""
-        print("🔄 Checking Arduino status...")
+        log.info("🔄 Checking Arduino status...")
         result = await self.call_tool("get_arduino_status")
-        
+        self.show_status_result(result)
+    
+    def show_status_result(self, result: Dict[str, Any]):
+        """Print the Arduino connection status"""
         if result.get("connected"):
             print(f"✅ Arduino connected on {result.get('port')} at {result.get('baudrate')} baud")
         else:
             print("❌ Arduino not connected")
     
-    async def handle_ask_command(self):
+    async def handle_ask_command(self, question: Optional[str] = None):
         """Handle AI question"""
-        question = input("🤔 Ask AI: ").strip()
+        if question is None:
+            question = await self._ainput("🤔 Ask AI: ")
+        question = question.strip()
         if not question:
             print("❌ Please enter a question")
             return
         
-        print("🔄 Asking AI...")
+        log.info("🔄 Asking AI...")
         result = await self.call_tool("ask_ai", {"question": question})
-        
+        self.show_ask_result(result)
+    
+    def show_ask_result(self, result: Dict[str, Any]):
+        """Print the AI's answer"""
         if result.get("success"):
             print(f"🤖 AI Answer: {result.get('answer')}")
         else:
             print(f"❌ Failed: {result.get('error', 'Unknown error')}")
     
-    async def handle_analyze_command(self):
+    async def handle_analyze_command(self, context: Optional[str] = None):
         """Handle sensor analysis"""
-        print("🔄 Reading sensor for analysis...")
+        log.info("🔄 Reading sensor for analysis...")
         
         # First read current IR sensor
         ir_result = await self.call_tool("read_ir_sensor")
@@ -373,9 +798,11 @@ class ArduinoMCPClient:
         ir_value = ir_result["ir_sensor_value"]
         print(f"📊 Current IR value: {ir_value}")
         
-        context = input("📝 Context for analysis (optional): ").strip()
+        if context is None:
+            context = await self._ainput("📝 Context for analysis (optional): ")
+        context = context.strip()
         
-        print("🔄 Getting AI analysis...")
+        log.info("🔄 Getting AI analysis...")
         result = await self.call_tool("analyze_sensor_with_ai", {
             "ir_value": ir_value,
             "context": context
@@ -386,16 +813,21 @@ class ArduinoMCPClient:
         else:
             print(f"❌ Failed: {result.get('error', 'Unknown error')}")
     
-    async def handle_smart_command(self):
+    async def handle_smart_command(self, scenario: Optional[str] = None):
         """Handle smart LED control"""
-        scenario = input("📝 Describe the scenario: ").strip()
+        if scenario is None:
+            scenario = await self._ainput("📝 Describe the scenario: ")
+        scenario = scenario.strip()
         if not scenario:
             print("❌ Please describe the scenario")
             return
         
-        print("🔄 AI is analyzing scenario and controlling LED...")
+        log.info("🔄 AI is analyzing scenario and controlling LED...")
         result = await self.call_tool("smart_led_control", {"scenario": scenario})
-        
+        self.show_smart_result(result)
+    
+    def show_smart_result(self, result: Dict[str, Any]):
+        """Print the AI's LED decision and what was done"""
         if result.get("success"):
             print(f"🤖 AI Decision: {result.get('ai_decision')}")
             print(f"📊 IR Sensor was: {result.get('ir_sensor')}")
@@ -409,38 +841,49 @@ class ArduinoMCPClient:
     
     async def handle_tools_command(self):
         """List all available tools"""
-        print("🔄 Fetching available tools...")
+        log.info("🔄 Fetching available tools...")
         try:
             tools = await self.list_tools()
             print(f"\n🛠️  Available Tools ({len(tools)}):")
-            for i, tool in enumerate(tools, 1):
-                print(f"  {i}. {tool['name']}")
-                print(f"     📝 {tool['description']}")
+            lines = [
+                f"  {i}. {tool['name']}\n     📝 {tool['description']}\n"
+                for i, tool in enumerate(tools, 1)
+            ]
+            sys.stdout.write("".join(lines))
         except Exception as e:
             print(f"❌ Failed to fetch tools: {e}")
     
     async def handle_debug_command(self):
         """Handle Arduino debug command"""
-        print("🔄 Running Arduino communication debug...")
+        log.info("🔄 Running Arduino communication debug...")
         result = await self.call_tool("debug_arduino_raw")
-        
+        self.show_debug_result(result)
+    
+    def show_debug_result(self, result: Dict[str, Any]):
+        """Print the per-command Arduino debug report"""
         if result.get("success"):
             debug_results = result.get("debug_results", {})
+            # Build the whole report first and write it in one go
+            lines = []
             for cmd, data in debug_results.items():
-                print(f"\n🔍 Command: {cmd}")
+                lines.append(f"\n🔍 Command: {cmd}\n")
                 if data.get("error"):
-                    print(f"  ❌ Error: {data['error']}")
+                    lines.append(f"  ❌ Error: {data['error']}\n")
                 else:
                     responses = data.get("responses", [])
-                    print(f"  ✅ Responses: {responses}")
+                    lines.append(f"  ✅ Responses: {responses}\n")
+            sys.stdout.write("".join(lines))
         else:
             print(f"❌ Debug failed: {result.get('error', 'Unknown error')}")
     
     async def handle_ping_command(self):
         """Handle Arduino ping test"""
-        print("🔄 Pinging Arduino...")
+        log.info("🔄 Pinging Arduino...")
         result = await self.call_tool("test_arduino_communication")
-        
+        self.show_ping_result(result)
+    
+    def show_ping_result(self, result: Dict[str, Any]):
+        """Print the result of an Arduino ping"""
         if result.get("success"):
             print(f"✅ Arduino responded: {result.get('response')}")
             if result.get("all_responses"):
@@ -450,33 +893,48 @@ class ArduinoMCPClient:
     
     async def cleanup(self):
         """Cleanup resources"""
-        if self.server_process:
-            print("🔄 Shutting down MCP server...")
+        if self.server_transport and self.socket_path:
+            # Leave the shared daemon running for the next client
+            log.info("🔌 Disconnecting from persistent MCP server...")
+            self.server_transport.close()
+            await self.server_protocol.closed
+        elif self.server_transport:
+            log.info("🔄 Shutting down MCP server...")
+            closed = self.server_protocol.closed
             
             # Check if process is still alive before trying to terminate
-            if self.server_process.returncode is None:
+            if self.server_transport.get_returncode() is None:
                 try:
-                    self.server_process.terminate()
-                    await asyncio.wait_for(self.server_process.wait(), timeout=5.0)
-                    print("✅ Server shut down gracefully")
-                except asyncio.TimeoutError:
-                    print("⚠️  Server didn't shut down gracefully, killing...")
-                    self.server_process.kill()
-                    await self.server_process.wait()
-                    print("🔪 Server killed")
+                    self.server_transport.terminate()
+                    
+                    # The server normally exits within a few ms of SIGTERM, so
+                    # poll briefly and escalate instead of waiting seconds
+                    for _ in range(20):
+                        if self.server_transport.get_returncode() is not None:
+                            await closed
+                            log.info("✅ Server shut down gracefully")
+                            break
+                        await asyncio.sleep(0.01)
+                    else:
+                        log.warning("⚠️  Server didn't shut down gracefully, killing...")
+                        self.server_transport.kill()
+                        await closed
+                        log.info("🔪 Server killed")
                 except ProcessLookupError:
-                    print("ℹ️  Server process already terminated")
+                    log.info("ℹ️  Server process already terminated")
             else:
-                print("ℹ️  Server process was already terminated")
+                log.info("ℹ️  Server process was already terminated")
+            
+            self.server_transport.close()
 
-async def main():
-    client = ArduinoMCPClient()
+async def main(socket_path: Optional[str] = None, main_path: Optional[str] = None):
+    client = ArduinoMCPClient(socket_path, main_path)
     
     try:
-        print("🚀 Starting Arduino MCP Client...")
+        log.info("🚀 Starting Arduino MCP Client...")
         await client.start_server()
         await client.interactive_session()
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print("\n👋 Shutting down...")
     except Exception as e:
         print(f"❌ Fatal error: {e}")
@@ -484,10 +942,22 @@ async def main():
         await client.cleanup()
 
 if __name__ == "__main__":
-    # Check if we're in the right directory
-    if not os.path.exists("main.py"):
+    # Check if we're in the right directory, once; the client reuses the result
+    MAIN_PATH = os.path.abspath("main.py")
+    if not os.path.exists(MAIN_PATH):
         print("❌ main.py not found in current directory!")
         print("Please run this client from the directory containing main.py")
         sys.exit(1)
     
-    asyncio.run(main())
+    # Progress messages only when a person is watching; scripts get warnings and results
+    logging.basicConfig(
+        level=logging.INFO if sys.stdout.isatty() else logging.WARNING,
+        format="%(message)s",
+        stream=sys.stdout
+    )
+    
+    # --persistent shares one long-running server between client runs
+    try:
+        asyncio.run(main(DEFAULT_SOCKET_PATH if "--persistent" in sys.argv[1:] else None, MAIN_PATH))
+    except KeyboardInterrupt:
+        pass  # A second Ctrl-C during cleanup; main already said goodbye
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Persistent MCP daemon: runs main.py once and shares it with many clients over a Unix socket
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import stat
+import sys
+from typing import Dict, Any, Optional, Tuple
+
+def _default_socket_path() -> str:
+    """A socket in a per-user directory, so users never share or hijack a daemon"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "arduino-mcp", "daemon.sock")
+    return os.path.join(f"/tmp/arduino-mcp-{os.getuid()}", "daemon.sock")
+
+DEFAULT_SOCKET_PATH = _default_socket_path()
+
+# The server next to this file, whatever the current directory
+DEFAULT_MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+log = logging.getLogger("arduino_mcp.daemon")
+
+def log_path_for(socket_path: str) -> str:
+    """Where the daemon and its server write diagnostics"""
+    return socket_path + ".log"
+
+def prepare_socket_dir(socket_path: str):
+    """Create the socket's directory as 0700, refusing one others could tamper with"""
+    directory = os.path.dirname(os.path.abspath(socket_path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{directory} is not a directory owned by this user")
+    if st.st_mode & 0o022:
+        raise PermissionError(f"{directory} is writable by other users")
+
+def open_private(path: str, flags: int) -> int:
+    """Open a file in the socket directory as 0600, never following a symlink"""
+    return os.open(path, flags | os.O_CREAT | os.O_NOFOLLOW | os.O_CLOEXEC, 0o600)
+
+# AI responses can be long, so allow large lines on the stream readers
+_LINE_LIMIT = 16 * 1024 * 1024
+
+class MCPDaemon:
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, main_path: str = DEFAULT_MAIN_PATH):
+        self.socket_path = socket_path
+        self.main_path = main_path
+        self.server_process = None
+        self.next_id = 0
+        # Daemon-side request ID -> (client writer, client's own request ID)
+        self.routes: Dict[int, Tuple[asyncio.StreamWriter, Any]] = {}
+        # The server session is initialized once; later clients get the cached result
+        self.init_result: Optional[Dict[str, Any]] = None
+        self.init_request_id: Optional[int] = None
+        self.initialized = False
+        self.clients = set()
+    
+    async def run(self):
+        """Start the server and accept clients until the server exits"""
+        # Held for the daemon's lifetime: a second daemon started at the same
+        # moment backs off instead of replacing the live socket
+        prepare_socket_dir(self.socket_path)
+        lock = open_private(self.socket_path + ".lock", os.O_RDWR)
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            log.warning(f"Another daemon already serves {self.socket_path}")
+            os.close(lock)
+            return
+        
+        # The server inherits our stderr, so its diagnostics land in the daemon log
+        self.server_process = await asyncio.create_subprocess_exec(
+            sys.executable, self.main_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=_LINE_LIMIT
+        )
+        pump = asyncio.create_task(self.pump_server_output())
+        
+        # With the lock held, anything left at the path is from a dead daemon
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        
+        server = await asyncio.start_unix_server(
+            self.handle_client, path=self.socket_path, limit=_LINE_LIMIT
+        )
+        try:
+            async with server:
+                await self.server_process.wait()
+                log.warning(f"Server exited with code {self.server_process.returncode}")
+                # Route whatever the server wrote before exiting, then fail the rest
+                await asyncio.wait({pump}, timeout=1.0)
+                self.drop_clients()
+        finally:
+            pump.cancel()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            os.close(lock)
+    
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Forward one client's messages to the shared server"""
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                
+                forwarded = self.route_message(message, writer)
+                
+                if forwarded:
+                    self.server_process.stdin.write(json.dumps(forwarded).encode() + b"\n")
+                    await self.server_process.stdin.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # Responses for a disconnected client are dropped
+            for daemon_id in [i for i, (w, _) in self.routes.items() if w is writer]:
+                del self.routes[daemon_id]
+            self.clients.discard(writer)
+            writer.close()
+    
+    def drop_clients(self):
+        """Answer every unanswered request with an error and disconnect all clients"""
+        for writer, client_id in self.routes.values():
+            self.send_to_client(writer, {
+                "jsonrpc": "2.0",
+                "id": client_id,
+                "error": {"code": -32603, "message": "MCP server exited"}
+            })
+        self.routes.clear()
+        for writer in list(self.clients):
+            writer.close()
+    
+    def route_message(self, message: Any, writer: asyncio.StreamWriter) -> Optional[Dict[str, Any]]:
+        """Rewrite a client message for the server, or answer it locally"""
+        if not isinstance(message, dict):
+            return None
+        
+        method = message.get("method")
+        
+        if method == "initialize" and self.init_result is not None:
+            self.send_to_client(writer, {"jsonrpc": "2.0", "id": message.get("id"), "result": self.init_result})
+            return None
+        
+        if method == "notifications/initialized":
+            if self.initialized:
+                return None
+            self.initialized = True
+        
+        if "id" not in message:
+            return message
+        
+        # Client IDs overlap, so give every request a daemon-wide ID
+        self.next_id += 1
+        self.routes[self.next_id] = (writer, message["id"])
+        if method == "initialize":
+            self.init_request_id = self.next_id
+        return {**message, "id": self.next_id}
+    
+    async def pump_server_output(self):
+        """Route server responses back to the client that sent the request"""
+        while True:
+            line = await self.server_process.stdout.readline()
+            if not line:
+                break
+            
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Stray prints from the server
+            
+            routed = self.route_response(message)
+            if routed:
+                self.send_to_client(*routed)
+    
+    def route_response(self, response: Any) -> Optional[Tuple[asyncio.StreamWriter, Dict[str, Any]]]:
+        """Map a server response back to its client and original request ID"""
+        if not isinstance(response, dict) or "method" in response:
+            return None  # Server-initiated messages are not forwarded
+        
+        daemon_id = response.get("id")
+        route = self.routes.pop(daemon_id, None)
+        if route is None:
+            return None
+        
+        writer, client_id = route
+        if daemon_id == self.init_request_id and "result" in response:
+            self.init_result = response["result"]
+        
+        return writer, {**response, "id": client_id}
+    
+    def send_to_client(self, writer: asyncio.StreamWriter, message: Any):
+        """Write a message to a client, ignoring clients that went away"""
+        if writer.is_closing():
+            return
+        writer.write(json.dumps(message).encode() + b"\n")
+
+def main():
+    """Main entry point"""
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOCKET_PATH
+    main_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MAIN_PATH
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    log.info(f"Serving {main_path} at {socket_path}")
+    try:
+        asyncio.run(MCPDaemon(socket_path, main_path).run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,91 @@
 #!/usr/bin/env python3
 import asyncio
+import functools
 import json
+import logging
 import os
+import pathlib
+import re
+import aioserial
 import serial
 import serial.tools.list_ports
+import sys
 import time
+import types
 from mcp.server.fastmcp import FastMCP
 import google.generativeai as genai
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Diagnostics go to stderr: stdout carries the MCP stdio transport
+log = logging.getLogger("arduino_mcp")
+
+# A whole IR reply in one of the sketch's formats: "1", "IR:1", "IR_VALUE: -1"
+_IR_RE = re.compile(r'(?:IR(?:_VALUE)?:\s*)?(-?\d+)')
+
+# The "LED:ON" / "LED:OFF" prefix smart_led_control asks the AI to start with
+_LED_DECISION_RE = re.compile(r'\s*LED:(ON|OFF)\b', re.I)
+
+# Wire bytes for the sketch's fixed command set; anything else is encoded per call
+_PRECOMPUTED_CMDS = {c: (c + "\n").encode("ascii") for c in ("PING", "IR?", "STATUS", "LED:ON", "LED:OFF")}
+
+# A real PING reply: printable ASCII with at least one letter or digit. At the
+# wrong baud rate the line reads as NULs (framing errors) or high-bit noise
+_PING_REPLY_RE = re.compile(rb'[\x20-\x7e]*[A-Za-z0-9][\x20-\x7e]*')
+
+# Sketches that still call Serial.begin(9600) are retried at this rate
+_FALLBACK_BAUDRATE = 9600
+
+# Last port an Arduino answered on and the baud rate it answered at, so
+# restarts skip the comports() scan and the 115200 attempt on 9600 sketches
+_PORT_CACHE = pathlib.Path.home() / ".cache" / "arduino_mcp_port"
+
+# Fixed error results, shared instead of rebuilt per call; treat them as read-only
+_ERR_NOT_CONNECTED = {"success": False, "error": "Arduino not connected"}
+_ERR_BAD_LED_STATE = {"success": False, "error": "State must be 'ON' or 'OFF'"}
+_ERR_NO_RESPONSE = {"success": False, "error": "No response from Arduino"}
+
+# Prompt templates, filled in with str.format by the AI tools
+_SENSOR_ANALYSIS_TMPL = """
+Analyze this IR sensor reading from an Arduino:
+
+IR Sensor Value: {ir} (0 = no object detected, 1 = object detected)
+Context: {ctx}
+
+Please provide:
+1. What this sensor reading means
+2. Possible actions to take
+3. Any safety considerations
+
+Keep response concise and practical.
+"""
+
+_SMART_LED_TMPL = """
+You're controlling an Arduino with LED and IR sensor. Current situation:
+
+IR Sensor: {ir} (0 = no object, 1 = object detected)
+Scenario: {scenario}
+
+Should the LED be ON or OFF? Start your response with exactly "LED:ON" or "LED:OFF" followed by your reason.
+"""
+
 class ArduinoMCPServer:
-    def __init__(self, port=None, baudrate=9600):
+    def __init__(self, port=None, baudrate=115200):
         self.mcp = FastMCP("Arduino AI Controller")
         self.arduino = None
         self.port = port
         self.baudrate = baudrate
+        # One command/response exchange on the port at a time
+        self.serial_lock = asyncio.Lock()
+        # Lines from the background reader; filled only while a command waits
+        self._rx_queue = asyncio.Queue()
+        self._reader = None
+        self._awaiting = False
+        # Last IR reading, used to start smart_led_control's AI call early
+        self._last_ir = None
+        # Called with lines the Arduino sends while no command is waiting
+        self.on_unsolicited = None
         
         # Initialize components
         self.setup_arduino()
@@ -25,7 +94,15 @@ class ArduinoMCPServer:
     
     def setup_arduino(self):
         """Initialize Arduino connection"""
+        cached, cached_baudrate = self.load_cached_port()
         if self.port is None:
+            # Try the port remembered from the last run before enumerating devices
+            if cached:
+                if self.connect_arduino(cached, cached_baudrate, from_cache=True):
+                    return
+                _PORT_CACHE.unlink(missing_ok=True)
+                self.port = None
+            
             # Auto-detect Arduino
             ports = serial.tools.list_ports.comports()
             for port in ports:
@@ -34,71 +111,198 @@ class ArduinoMCPServer:
                     break
         
         if self.port is None:
-            print("No Arduino found. Please specify port manually.")
+            log.warning("No Arduino found. Please specify port manually.")
             return
         
+        self.connect_arduino(self.port, cached_baudrate if self.port == cached else None)
+    
+    def connect_arduino(self, port, preferred_baudrate=None, from_cache=False):
+        """Open and validate the Arduino on port, remembering it on success
+        
+        preferred_baudrate, the rate negotiated on the last run, is tried
+        before the configured rate and the 9600 fallback. A cached port that
+        doesn't answer PING is given up so the caller can rescan; any other
+        port is kept at the configured rate with a warning.
+        """
+        baudrates = list(dict.fromkeys(
+            rate for rate in (preferred_baudrate, self.baudrate, _FALLBACK_BAUDRATE) if rate
+        ))
         try:
-            self.arduino = serial.Serial(self.port, self.baudrate, timeout=2)
-            time.sleep(2)  # Wait for Arduino to initialize
+            # Short timeout so a dead Arduino fails fast; readline still
+            # returns as soon as the newline arrives
+            self.arduino = aioserial.AioSerial(port=port, baudrate=baudrates[0], timeout=0.2)
+            self.port = port
+            self.enable_low_latency()
             
-            # Clear any initial garbage from the buffer
-            self.arduino.flushInput()
-            self.arduino.flushOutput()
+            # PING until the sketch answers instead of sleeping through the
+            # bootloader; only UNO-class boards need the full 2 s. The board
+            # has booted by the time later rates are tried, so they get a short window
+            self.arduino.timeout = 0.1
+            for i, rate in enumerate(baudrates):
+                self.arduino.baudrate = rate
+                if self.handshake(2.0 if i == 0 else 0.5):
+                    self.baudrate = rate
+                    answered = True
+                    break
+            else:
+                if from_cache:
+                    raise serial.SerialException(f"no reply to PING on {port}")
+                log.warning("No reply to PING on %s; using it at %s baud anyway", port, self.baudrate)
+                self.arduino.baudrate = self.baudrate
+                answered = False
+            self.arduino.timeout = 0.2
             
-            print(f"Arduino connected on {self.port}")
+            # Clear boot garbage and any replies to extra PINGs
+            self.arduino.reset_input_buffer()
+            self.arduino.reset_output_buffer()
+            
+            log.info("Arduino connected on %s at %s baud", self.port, self.baudrate)
+            if answered:
+                self.save_cached_port()
+            return True
         except Exception as e:
-            print(f"Failed to connect to Arduino: {e}")
+            log.warning("Failed to connect to Arduino: %s", e)
+            if self.arduino:
+                self.arduino.close()
             self.arduino = None
+            return False
+    
+    def handshake(self, timeout):
+        """PING until a clean reply arrives; False if none within timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self.arduino.write(_PRECOMPUTED_CMDS["PING"])
+            if _PING_REPLY_RE.fullmatch(self.arduino.read_until(b"\n").strip()):
+                return True
+        return False
+    
+    def load_cached_port(self):
+        """Return the cached (port, baudrate); port is None unless its device node still exists"""
+        try:
+            fields = _PORT_CACHE.read_text().split()
+        except OSError:
+            return None, None
+        
+        if not fields or not os.path.exists(fields[0]):
+            return None, None
+        # Caches written before the rate was saved hold only the port
+        baudrate = int(fields[1]) if len(fields) > 1 and fields[1].isdigit() else None
+        return fields[0], baudrate
+    
+    def save_cached_port(self):
+        """Remember the connected port and its negotiated rate for the next start"""
+        try:
+            _PORT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            _PORT_CACHE.write_text(f"{self.port} {self.baudrate}\n")
+        except OSError:
+            pass  # Read-only home; we just rescan next time
+    
+    def enable_low_latency(self):
+        """Shrink the USB-serial latency timer so short replies aren't held for 16 ms
+        
+        Uses the ASYNC_LOW_LATENCY ioctl, falling back to the FTDI sysfs
+        latency_timer on Linux. POSIX only: on Windows set the latency timer
+        in the FTDI port's advanced settings instead.
+        """
+        try:
+            self.arduino.set_low_latency_mode(True)
+            return
+        except (AttributeError, OSError, NotImplementedError, ValueError):
+            pass
+        
+        latency_timer = f"/sys/bus/usb-serial/devices/{os.path.basename(self.port)}/latency_timer"
+        try:
+            with open(latency_timer, "w") as f:
+                f.write("1")
+        except OSError:
+            pass  # Not an FTDI device, or no permission
     
-    def arduino_send_command(self, command, expected_response_lines=1, retry_count=3):
+    async def arduino_send_command(self, command, expected_response_lines=1, retry_count=3):
         """Send command to Arduino with robust error handling"""
         if not self.arduino:
             return None, "Arduino not connected"
         
         for attempt in range(retry_count):
             try:
-                # Clear buffers
-                self.arduino.flushInput()
-                self.arduino.flushOutput()
+                # Back off exponentially after a failed attempt
+                if attempt:
+                    await asyncio.sleep(min(0.05 * (2 ** (attempt - 1)), 0.4))
                 
-                # Send command
-                full_command = f"{command}\n"
-                self.arduino.write(full_command.encode())
-                time.sleep(0.2)  # Give Arduino time to process
-                
-                # Read response(s)
-                responses = []
-                for _ in range(expected_response_lines):
-                    response = self.arduino.readline().decode().strip()
-                    if response:  # Only add non-empty responses
-                        responses.append(response)
-                    else:
-                        # Try reading again with a bit more delay
-                        time.sleep(0.1)
-                        response = self.arduino.readline().decode().strip()
-                        if response:
-                            responses.append(response)
+                responses = await self.send_and_await(command, expected_response_lines)
                 
                 if responses:
                     return responses, None
                 else:
-                    print(f"Attempt {attempt + 1}: No response from Arduino for command '{command}'")
-                    time.sleep(0.5)  # Wait before retry
+                    log.debug("Attempt %d: No response from Arduino for command '%s'", attempt + 1, command)
                     
             except Exception as e:
-                print(f"Attempt {attempt + 1}: Arduino communication error: {e}")
-                time.sleep(0.5)
+                log.warning("Attempt %d: Arduino communication error: %s", attempt + 1, e)
         
         return None, f"Failed to get response from Arduino after {retry_count} attempts"
     
+    async def send_and_await(self, command, n_lines=1, timeout=0.2):
+        """Write one command and collect up to n_lines reply lines from the reader"""
+        if self._reader is None:
+            # Started on first use: the event loop only exists once FastMCP runs
+            self._reader = asyncio.create_task(self._reader_loop())
+        
+        async with self.serial_lock:
+            # Late replies to a timed-out command are stale by now
+            while not self._rx_queue.empty():
+                self._rx_queue.get_nowait()
+            
+            self._awaiting = True
+            try:
+                payload = _PRECOMPUTED_CMDS.get(command) or (command + "\n").encode("ascii")
+                await self.arduino.write_async(payload)
+                
+                responses = []
+                for _ in range(n_lines):
+                    try:
+                        responses.append(await asyncio.wait_for(self._rx_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                return [r.decode(errors="replace") for r in responses]
+            finally:
+                self._awaiting = False
+    
+    async def _reader_loop(self):
+        """Own the read side of the port, queueing every non-empty line"""
+        partial = bytearray()
+        try:
+            while True:
+                chunk = await self.arduino.readline_async()
+                partial += chunk
+                if not chunk.endswith(b"\n"):
+                    continue  # Port timeout, possibly in the middle of a line
+                
+                line = bytes(partial).strip()
+                partial.clear()
+                if not line:
+                    continue
+                
+                if self._awaiting:
+                    self._rx_queue.put_nowait(line)
+                elif self.on_unsolicited:
+                    self.on_unsolicited(line.decode(errors="replace"))
+        except Exception as e:
+            log.error("Arduino reader stopped: %s", e)
+        finally:
+            # The next command restarts the reader
+            self._reader = None
+    
     def setup_gemini(self):
-        """Initialize Gemini API"""
+        """Configure Gemini API; the chat itself is created on first use"""
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
         genai.configure(api_key=api_key)
-        
+        log.info("Gemini AI configured")
+    
+    @functools.cached_property
+    def chat(self):
+        """Gemini chat session, started the first time an AI tool needs it"""
         self.model = genai.GenerativeModel(
             model_name="gemini-2.0-flash-exp",
             generation_config={
@@ -107,243 +311,264 @@ class ArduinoMCPServer:
             }
         )
         
-        self.chat = self.model.start_chat(history=[])
-        print("Gemini AI initialized")
+        return self.model.start_chat(history=[])
     
     def setup_tools(self):
-        """Setup MCP tools"""
-        
-        @self.mcp.tool()
-        def led_control(state: str) -> dict:
-            """Control the LED on Arduino (ON/OFF)"""
-            if not self.arduino:
-                return {"success": False, "error": "Arduino not connected"}
-            
-            if state not in ["ON", "OFF"]:
-                return {"success": False, "error": "State must be 'ON' or 'OFF'"}
-            
-            responses, error = self.arduino_send_command(f"LED:{state}")
-            
-            if error:
-                return {"success": False, "error": error}
-            
+        """Register the module-level MCP tools, bound to this server"""
+        for tool in _TOOLS:
+            # A bound method keeps the tool's name, docstring and coroutine-ness,
+            # and its signature without the server argument
+            self.mcp.add_tool(types.MethodType(tool, self))
+    
+    def run(self):
+        """Run the MCP server"""
+        self.mcp.run()
+
+# MCP tools; each takes the server first and is bound to it in setup_tools
+
+async def led_control(server: "ArduinoMCPServer", state: str) -> dict:
+    """Control the LED on Arduino (ON/OFF)"""
+    if not server.arduino:
+        return _ERR_NOT_CONNECTED
+    
+    if state not in ["ON", "OFF"]:
+        return _ERR_BAD_LED_STATE
+    
+    command = f"LED:{state}"
+    responses, error = await server.arduino_send_command(command)
+    
+    if error:
+        return {"success": False, "error": error}
+    
+    return {
+        "success": True,
+        "response": responses[0] if responses else "No response",
+        "led_state": state,
+        "command": command
+    }
+
+async def read_ir_sensor(server: "ArduinoMCPServer") -> dict:
+    """Read the IR sensor value from Arduino"""
+    if not server.arduino:
+        return _ERR_NOT_CONNECTED
+    
+    responses, error = await server.arduino_send_command("IR?")
+    
+    if error:
+        return {"success": False, "error": error}
+    
+    if not responses:
+        return _ERR_NO_RESPONSE
+    
+    # Already stripped by the reader
+    response_text = responses[0]
+    
+    # The usual bare-digit reply skips the regex; anything that isn't one of
+    # the documented formats, like an error line, is reported unparsed
+    if response_text.isdecimal():
+        ir_value = int(response_text)
+    else:
+        match = _IR_RE.fullmatch(response_text)
+        if not match:
+            # If we can't parse it, return the raw response for debugging
             return {
-                "success": True,
-                "command": f"LED:{state}",
-                "response": responses[0] if responses else "No response",
-                "led_state": state
+                "success": False, 
+                "error": f"Could not parse IR response: '{response_text}'"
             }
+        ir_value = int(match.group(1))
+    server._last_ir = ir_value
+    
+    return {
+        "success": True,
+        "ir_sensor_value": ir_value,
+        "interpretation": "Object detected" if ir_value == 1 else "No object detected",
+        "raw_response": response_text
+    }
+
+async def test_arduino_communication(server: "ArduinoMCPServer") -> dict:
+    """Test Arduino communication with a simple ping"""
+    if not server.arduino:
+        return _ERR_NOT_CONNECTED
+    
+    # Try a simple command that should always work
+    responses, error = await server.arduino_send_command("PING")
+    
+    if error:
+        return {"success": False, "error": error}
+    
+    return {
+        "success": True,
+        "response": responses[0] if responses else "No response",
+        "all_responses": responses
+    }
+
+async def get_arduino_status(server: "ArduinoMCPServer") -> dict:
+    """Get Arduino connection status"""
+    status = {
+        "connected": server.arduino is not None,
+        "port": server.port,
+        "baudrate": server.baudrate
+    }
+    
+    if server.arduino:
+        try:
+            status["is_open"] = server.arduino.is_open
+            status["timeout"] = server.arduino.timeout
+        except:
+            status["connection_error"] = "Could not read port status"
+    
+    return status
+
+async def debug_arduino_raw(server: "ArduinoMCPServer") -> dict:
+    """Debug tool to send raw commands and see responses"""
+    if not server.arduino:
+        return _ERR_NOT_CONNECTED
+    
+    # Try multiple commands to debug
+    commands_to_test = ["PING", "IR?", "LED:ON", "LED:OFF", "STATUS"]
+    
+    # The serial lock still puts one command on the wire at a time
+    results = await asyncio.gather(
+        *(server.arduino_send_command(cmd) for cmd in commands_to_test)
+    )
+    debug_results = {
+        cmd: {"responses": responses, "error": error}
+        for cmd, (responses, error) in zip(commands_to_test, results)
+    }
+    
+    return {
+        "success": True,
+        "debug_results": debug_results
+    }
+
+async def ask_ai(server: "ArduinoMCPServer", question: str) -> dict:
+    """Ask Gemini AI anything"""
+    try:
+        response = await server.chat.send_message_async(question)
         
-        @self.mcp.tool()
-        def read_ir_sensor() -> dict:
-            """Read the IR sensor value from Arduino"""
-            if not self.arduino:
-                return {"success": False, "error": "Arduino not connected"}
-            
-            responses, error = self.arduino_send_command("IR?")
-            
-            if error:
-                return {"success": False, "error": error}
-            
-            if not responses:
-                return {"success": False, "error": "No response from Arduino"}
-            
-            try:
-                # Try to parse the response
-                response_text = responses[0].strip()
-                
-                # Handle different possible response formats
-                if response_text.isdigit():
-                    ir_value = int(response_text)
-                elif ':' in response_text:
-                    # Handle format like "IR:1" or "IR_VALUE:1"
-                    ir_value = int(response_text.split(':')[-1])
-                else:
-                    # If we can't parse it, return the raw response for debugging
-                    return {
-                        "success": False, 
-                        "error": f"Could not parse IR response: '{response_text}'"
-                    }
-                
-                return {
-                    "success": True,
-                    "ir_sensor_value": ir_value,
-                    "interpretation": "Object detected" if ir_value == 1 else "No object detected",
-                    "raw_response": response_text
-                }
-                
-            except (ValueError, IndexError) as e:
-                return {
-                    "success": False, 
-                    "error": f"Failed to parse IR sensor value: {e}. Raw response: '{responses[0] if responses else 'None'}'"
-                }
+        return {
+            "success": True,
+            "question": question,
+            "answer": response.text
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+async def analyze_sensor_with_ai(server: "ArduinoMCPServer", ir_value: int, context: str = "") -> dict:
+    """Use AI to analyze IR sensor data and suggest actions"""
+    try:
+        prompt = _SENSOR_ANALYSIS_TMPL.format(
+            ir=ir_value,
+            ctx=context if context else "General sensing"
+        )
         
-        @self.mcp.tool()
-        def test_arduino_communication() -> dict:
-            """Test Arduino communication with a simple ping"""
-            if not self.arduino:
-                return {"success": False, "error": "Arduino not connected"}
-            
-            # Try a simple command that should always work
-            responses, error = self.arduino_send_command("PING")
-            
-            if error:
-                return {"success": False, "error": error}
-            
-            return {
-                "success": True,
-                "response": responses[0] if responses else "No response",
-                "all_responses": responses
-            }
+        response = await server.chat.send_message_async(prompt)
         
-        @self.mcp.tool()
-        def get_arduino_status() -> dict:
-            """Get Arduino connection status"""
-            status = {
-                "connected": self.arduino is not None,
-                "port": self.port,
-                "baudrate": self.baudrate
-            }
-            
-            if self.arduino:
-                try:
-                    status["is_open"] = self.arduino.is_open
-                    status["timeout"] = self.arduino.timeout
-                except:
-                    status["connection_error"] = "Could not read port status"
-            
-            return status
+        return {
+            "success": True,
+            "ir_value": ir_value,
+            "context": context,
+            "ai_analysis": response.text
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+async def smart_led_control(server: "ArduinoMCPServer", scenario: str) -> dict:
+    """Use AI to decide LED state based on sensor data"""
+    # Ask the AI about the last known IR value while the sensor is read. The
+    # guess goes through the stateless model, so the shared chat only gains the
+    # turn if the fresh reading matches it
+    ir_hint = server._last_ir
+    ai_task = None
+    guess_turn = None
+    try:
+        ir_task = asyncio.create_task(read_ir_sensor(server))
+        if ir_hint is not None:
+            chat = server.chat  # Also creates server.model on first use
+            guess_turn = {"role": "user", "parts": [_SMART_LED_TMPL.format(ir=ir_hint, scenario=scenario)]}
+            ai_task = asyncio.create_task(server.model.generate_content_async([*chat.history, guess_turn]))
         
-        @self.mcp.tool()
-        def debug_arduino_raw() -> dict:
-            """Debug tool to send raw commands and see responses"""
-            if not self.arduino:
-                return {"success": False, "error": "Arduino not connected"}
-            
-            # Try multiple commands to debug
-            debug_results = {}
-            
-            commands_to_test = ["PING", "IR?", "LED:ON", "LED:OFF", "STATUS"]
-            
-            for cmd in commands_to_test:
-                responses, error = self.arduino_send_command(cmd)
-                debug_results[cmd] = {
-                    "responses": responses,
-                    "error": error
-                }
-            
-            return {
-                "success": True,
-                "debug_results": debug_results
-            }
+        ir_result = await ir_task
         
-        @self.mcp.tool()
-        def ask_ai(question: str) -> dict:
-            """Ask Gemini AI anything"""
-            try:
-                response = self.chat.send_message(question)
-                
-                return {
-                    "success": True,
-                    "question": question,
-                    "answer": response.text
-                }
-            except Exception as e:
-                return {"success": False, "error": str(e)}
+        if not ir_result["success"]:
+            if ai_task:
+                ai_task.cancel()
+            return ir_result
         
-        @self.mcp.tool()
-        def analyze_sensor_with_ai(ir_value: int, context: str = "") -> dict:
-            """Use AI to analyze IR sensor data and suggest actions"""
-            try:
-                prompt = f"""
-                Analyze this IR sensor reading from an Arduino:
-                
-                IR Sensor Value: {ir_value} (0 = no object detected, 1 = object detected)
-                Context: {context if context else "General sensing"}
-                
-                Please provide:
-                1. What this sensor reading means
-                2. Possible actions to take
-                3. Any safety considerations
-                
-                Keep response concise and practical.
-                """
-                
-                response = self.chat.send_message(prompt)
-                
-                return {
-                    "success": True,
-                    "ir_value": ir_value,
-                    "context": context,
-                    "ai_analysis": response.text
-                }
-            except Exception as e:
-                return {"success": False, "error": str(e)}
+        ir_value = ir_result["ir_sensor_value"]
         
-        @self.mcp.tool()
-        def smart_led_control(scenario: str) -> dict:
-            """Use AI to decide LED state based on sensor data"""
-            try:
-                # First get current IR sensor reading
-                ir_result = read_ir_sensor()
-                
-                if not ir_result["success"]:
-                    return ir_result
-                
-                ir_value = ir_result["ir_sensor_value"]
-                
-                prompt = f"""
-                You're controlling an Arduino with LED and IR sensor. Current situation:
-                
-                IR Sensor: {ir_value} (0 = no object, 1 = object detected)
-                Scenario: {scenario}
-                
-                Should the LED be ON or OFF? Start your response with exactly "LED:ON" or "LED:OFF" followed by your reason.
-                """
-                
-                ai_response = self.chat.send_message(prompt)
-                ai_text = ai_response.text.strip()
-                
-                # Simple and reliable parsing
-                if ai_text.upper().startswith("LED:ON"):
-                    led_state = "ON"
-                elif ai_text.upper().startswith("LED:OFF"):
-                    led_state = "OFF"
-                else:
-                    # If AI doesn't follow format, check which word appears first
-                    if "OFF" in ai_text.upper() and ai_text.upper().find("OFF") < ai_text.upper().find("ON"):
-                        led_state = "OFF"
-                    else:
-                        led_state = "ON"
-                
-                # Execute the LED control
-                led_result = led_control(led_state)
-                
-                return {
-                    "success": True,
-                    "scenario": scenario,
-                    "ir_sensor": ir_value,
-                    "ai_decision": ai_response.text,
-                    "led_action": led_result
-                }
-            except Exception as e:
-                return {"success": False, "error": str(e)}
-    
-    def run(self):
-        """Run the MCP server"""
-        self.mcp.run()
+        if ir_value == ir_hint:
+            ai_response = await ai_task
+            server.chat.history = [*server.chat.history, guess_turn, ai_response.candidates[0].content]
+        else:
+            if ai_task:
+                ai_task.cancel()
+            prompt = _SMART_LED_TMPL.format(ir=ir_value, scenario=scenario)
+            ai_response = await server.chat.send_message_async(prompt)
+        
+        ai_text = ai_response.text.strip()
+        
+        # Simple and reliable parsing
+        match = _LED_DECISION_RE.match(ai_text)
+        if match:
+            led_state = match.group(1).upper()
+        else:
+            # If AI doesn't follow format, check which word appears first
+            upper_text = ai_text.upper()
+            off_at = upper_text.find("OFF")
+            if off_at != -1 and off_at < upper_text.find("ON"):
+                led_state = "OFF"
+            else:
+                led_state = "ON"
+        
+        # Execute the LED control
+        led_result = await led_control(server, led_state)
+        
+        return {
+            "success": True,
+            "scenario": scenario,
+            "ir_sensor": ir_value,
+            "ai_decision": ai_response.text,
+            "led_action": led_result
+        }
+    except Exception as e:
+        if ai_task:
+            ai_task.cancel()
+        return {"success": False, "error": str(e)}
+
+_TOOLS = (
+    led_control,
+    read_ir_sensor,
+    test_arduino_communication,
+    get_arduino_status,
+    debug_arduino_raw,
+    ask_ai,
+    analyze_sensor_with_ai,
+    smart_led_control,
+)
 
 def main():
     """Main entry point"""
+    # Quiet by default; ARDUINO_MCP_LOG=INFO or DEBUG shows connection and retry details
+    level_name = os.getenv("ARDUINO_MCP_LOG", "WARNING").upper()
+    level = logging.getLevelName(level_name)  # The level number, or a string if unknown
+    logging.basicConfig(
+        level=level if isinstance(level, int) else logging.WARNING,
+        format="%(levelname)s %(name)s: %(message)s",
+        stream=sys.stderr
+    )
+    if not isinstance(level, int):
+        log.warning("Unknown ARDUINO_MCP_LOG level %r, using WARNING", level_name)
+    
     try:
         # You can specify Arduino port manually if needed
         # server = ArduinoMCPServer(port="/dev/ttyUSB0")
         server = ArduinoMCPServer()  # Auto-detect
         server.run()
     except KeyboardInterrupt:
-        print("\nShutting down server...")
+        log.info("Shutting down server...")
     except Exception as e:
-        print(f"Failed to start server: {e}")
+        log.error("Failed to start server: %s", e)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,54 @@
+"""Client-side request handling, against a fake call_tool"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import client  # noqa: E402
+
+
+class RecordingClient(client.ArduinoMCPClient):
+    """Records when each tool call starts and ends instead of talking to a server"""
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    async def call_tool(self, name, arguments=None):
+        self.events.append(("start", name))
+        await asyncio.sleep(0.01)
+        self.events.append(("end", name))
+        return {"success": True}
+
+
+def test_run_script_pipelines_reads_but_serializes_stateful_calls(capsys):
+    c = RecordingClient()
+    asyncio.run(c.run_script(["ir", "status", "led ON", "ask why?", "ping"]))
+
+    assert c.events == [
+        # Read-only calls overlap
+        ("start", "read_ir_sensor"), ("start", "get_arduino_status"),
+        ("end", "read_ir_sensor"), ("end", "get_arduino_status"),
+        # Stateful calls run alone, in order
+        ("start", "led_control"), ("end", "led_control"),
+        ("start", "ask_ai"), ("end", "ask_ai"),
+        ("start", "test_arduino_communication"), ("end", "test_arduino_communication"),
+    ]
+    out = capsys.readouterr().out
+    assert out.index("> ir") < out.index("> led ON") < out.index("> ask why?") < out.index("> ping")
+
+
+def test_pending_requests_accept_string_ids():
+    c = client.ArduinoMCPClient()
+
+    async def track():
+        loop = asyncio.get_running_loop()
+        by_int, by_str = loop.create_future(), loop.create_future()
+        c._add_pending(3, by_int)
+        c._add_pending("abc", by_str)
+        c._resolve_response({"jsonrpc": "2.0", "id": "abc", "result": "s"})
+        c._resolve_response({"jsonrpc": "2.0", "id": 3, "result": "i"})
+        return await by_int, await by_str
+
+    assert asyncio.run(track()) == ({"jsonrpc": "2.0", "id": 3, "result": "i"}, {"jsonrpc": "2.0", "id": "abc", "result": "s"})
@@ -0,0 +1,134 @@
+"""Persistent daemon: request routing, the cached initialize, and spawn/reuse"""
+import asyncio
+import json
+import os
+import sys
+import textwrap
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import client  # noqa: E402
+import daemon  # noqa: E402
+
+# Stands in for main.py: answers the handshake, reports its pids, exits on request
+FAKE_SERVER = textwrap.dedent("""
+    import json, os, sys
+    for line in sys.stdin:
+        message = json.loads(line)
+        if "id" not in message:
+            continue
+        method = message["method"]
+        if method == "initialize":
+            result = {"protocolVersion": "2024-11-05", "capabilities": {}, "serverInfo": {"name": "fake"}}
+        elif method == "tools/list":
+            result = {"tools": []}
+        elif message["params"]["name"] == "exit":
+            sys.exit(0)
+        else:
+            pids = {"server": os.getpid(), "daemon": os.getppid()}
+            result = {"content": [{"type": "text", "text": json.dumps(pids)}]}
+        print(json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": result}), flush=True)
+""")
+
+
+class FakeWriter:
+    def __init__(self):
+        self.sent = []
+
+    def is_closing(self):
+        return False
+
+    def write(self, data):
+        self.sent.append(json.loads(data))
+
+
+def test_overlapping_client_ids_are_remapped_and_restored():
+    d = daemon.MCPDaemon()
+    a, b = FakeWriter(), FakeWriter()
+
+    forwarded_a = d.route_message({"jsonrpc": "2.0", "id": 1, "method": "tools/list"}, a)
+    forwarded_b = d.route_message({"jsonrpc": "2.0", "id": 1, "method": "tools/list"}, b)
+    assert forwarded_a["id"] != forwarded_b["id"]
+
+    assert d.route_response({"jsonrpc": "2.0", "id": forwarded_b["id"], "result": "b"}) == (
+        b, {"jsonrpc": "2.0", "id": 1, "result": "b"}
+    )
+    assert d.route_response({"jsonrpc": "2.0", "id": forwarded_a["id"], "result": "a"}) == (
+        a, {"jsonrpc": "2.0", "id": 1, "result": "a"}
+    )
+    assert d.routes == {}
+
+
+def test_initialize_is_forwarded_once_and_then_answered_from_cache():
+    d = daemon.MCPDaemon()
+    first, second = FakeWriter(), FakeWriter()
+    init = {"jsonrpc": "2.0", "method": "initialize", "params": {}}
+    initialized = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+    forwarded = d.route_message({**init, "id": 7}, first)
+    d.route_response({"jsonrpc": "2.0", "id": forwarded["id"], "result": {"cached": True}})
+    assert d.route_message(initialized, first) == initialized
+
+    # A later client's handshake never reaches the server
+    assert d.route_message({**init, "id": 3}, second) is None
+    assert second.sent == [{"jsonrpc": "2.0", "id": 3, "result": {"cached": True}}]
+    assert d.route_message(initialized, second) is None
+
+
+def test_drop_clients_fails_pending_requests():
+    d = daemon.MCPDaemon()
+    w = FakeWriter()
+    w.close = lambda: None
+    d.clients.add(w)
+    d.route_message({"jsonrpc": "2.0", "id": 5, "method": "tools/list"}, w)
+
+    d.drop_clients()
+
+    assert w.sent[0]["id"] == 5 and "error" in w.sent[0]
+    assert d.routes == {}
+
+
+def test_prepare_socket_dir_refuses_shared_directories(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    try:
+        daemon.prepare_socket_dir(str(shared / "daemon.sock"))
+    except PermissionError:
+        pass
+    else:
+        raise AssertionError("a world-writable socket directory was accepted")
+
+    daemon.prepare_socket_dir(str(tmp_path / "private" / "daemon.sock"))
+    assert (tmp_path / "private").stat().st_mode & 0o777 == 0o700
+
+
+def test_daemon_is_spawned_once_and_reused(tmp_path):
+    main_path = tmp_path / "fake_main.py"
+    main_path.write_text(FAKE_SERVER)
+    socket_path = str(tmp_path / "run" / "d.sock")
+
+    async def session(tool):
+        c = client.ArduinoMCPClient(socket_path, str(main_path))
+        await c.start_server()
+        try:
+            started = time.monotonic()
+            return await c.call_tool(tool), time.monotonic() - started
+        finally:
+            await c.cleanup()
+
+    first, _ = asyncio.run(session("pids"))
+    second, _ = asyncio.run(session("pids"))
+    assert first == second  # Same daemon, same server process
+
+    # When the server dies, the waiting client is failed instead of timing out
+    result, elapsed = asyncio.run(session("exit"))
+    assert not result["success"]
+    assert elapsed < 5
+
+    for _ in range(50):
+        if not os.path.exists(socket_path):
+            break
+        time.sleep(0.1)
+    assert not os.path.exists(socket_path)
@@ -0,0 +1,143 @@
+"""Serial-side behaviour of ArduinoMCPServer against fake ports"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+for module in ("mcp", "google.generativeai", "aioserial", "serial", "dotenv"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import main  # noqa: E402
+
+
+class ScriptedPort:
+    """Answers every PING write with the next scripted reply line"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.pending = None
+
+    def write(self, data):
+        self.pending = self.replies.pop(0) if self.replies else b""
+
+    def read_until(self, expected=b"\n"):
+        reply, self.pending = self.pending or b"", None
+        return reply
+
+
+def handshake(replies, timeout=0.05):
+    server = main.ArduinoMCPServer.__new__(main.ArduinoMCPServer)
+    server.arduino = ScriptedPort(replies)
+    return server.handshake(timeout)
+
+
+def test_handshake_accepts_pong():
+    assert handshake([b"PONG\r\n"])
+
+
+def test_handshake_rejects_wrong_baud_nuls():
+    # A 9600 sketch read at 115200 arrives as framing-error NULs
+    assert not handshake([b"\x00\x00\x00\n"] * 1000)
+
+
+def test_handshake_rejects_high_bit_noise():
+    assert not handshake([b"\xf0\x80\xfe\n"] * 1000)
+
+
+class ChunkedPort:
+    """readline_async that returns chunks the way a timed-out readline does"""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    async def readline_async(self):
+        if self.chunks:
+            return self.chunks.pop(0)
+        await asyncio.sleep(0.01)
+        return b""
+
+
+async def read_lines(chunks, count):
+    server = main.ArduinoMCPServer.__new__(main.ArduinoMCPServer)
+    server.arduino = ChunkedPort(chunks)
+    server._rx_queue = asyncio.Queue()
+    server._awaiting = True
+    server.on_unsolicited = None
+    reader = asyncio.create_task(server._reader_loop())
+    try:
+        return [await asyncio.wait_for(server._rx_queue.get(), 1) for _ in range(count)]
+    finally:
+        reader.cancel()
+
+
+def test_reader_joins_lines_split_by_port_timeout():
+    chunks = [b"IR:", b"", b"1\r\n", b"PO", b"NG\r\n"]
+    assert asyncio.run(read_lines(chunks, 2)) == [b"IR:1", b"PONG"]
+
+
+class BaudSensitivePort:
+    """Answers PING only at the sketch's baud rate; other rates read as NULs"""
+
+    sketch_baudrate = 9600
+    opened = []
+
+    def __init__(self, port, baudrate, timeout):
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.tried = []
+        BaudSensitivePort.opened.append(self)
+
+    def write(self, data):
+        self.tried.append(self.baudrate)
+
+    def read_until(self, expected=b"\n"):
+        return b"PONG\r\n" if self.baudrate == self.sketch_baudrate else b"\x00\n"
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_cached_baudrate_is_tried_first(tmp_path, monkeypatch):
+    device = tmp_path / "ttyACM0"
+    device.touch()
+    cache = tmp_path / "arduino_mcp_port"
+    cache.write_text(f"{device} 9600\n")
+    monkeypatch.setattr(main, "_PORT_CACHE", cache)
+    monkeypatch.setattr(main.aioserial, "AioSerial", BaudSensitivePort)
+    BaudSensitivePort.opened.clear()
+
+    server = main.ArduinoMCPServer.__new__(main.ArduinoMCPServer)
+    server.port = None
+    server.baudrate = 115200
+    server.setup_arduino()
+
+    assert server.port == str(device)
+    assert server.baudrate == 9600
+    assert BaudSensitivePort.opened[0].tried == [9600]  # No 2 s wait at 115200
+    assert cache.read_text().split() == [str(device), "9600"]
+
+
+def test_silent_explicit_port_stays_connected(tmp_path, monkeypatch):
+    cache = tmp_path / "arduino_mcp_port"
+    monkeypatch.setattr(main, "_PORT_CACHE", cache)
+    monkeypatch.setattr(main.aioserial, "AioSerial", BaudSensitivePort)
+    monkeypatch.setattr(BaudSensitivePort, "sketch_baudrate", None)  # Never answers
+    monkeypatch.setattr(main.ArduinoMCPServer, "handshake", lambda self, timeout: False)
+
+    server = main.ArduinoMCPServer.__new__(main.ArduinoMCPServer)
+    server.port = "/dev/ttyUSER"
+    server.baudrate = 115200
+    server.setup_arduino()
+
+    assert server.arduino is not None
+    assert server.arduino.baudrate == 115200
+    assert not cache.exists()  # Only ports that answered are remembered
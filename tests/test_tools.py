@@ -0,0 +1,167 @@
+"""Call every registered MCP tool against fake serial and Gemini objects"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+for module in ("mcp", "google.generativeai", "aioserial", "serial", "dotenv"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import main  # noqa: E402
+
+# Canned Arduino replies, by command
+REPLIES = {
+    "PING": "PONG",
+    "IR?": "IR:1",
+    "STATUS": "OK",
+    "LED:ON": "LED ON",
+    "LED:OFF": "LED OFF",
+}
+
+# Example arguments for tools that take any
+TOOL_ARGS = {
+    "led_control": {"state": "ON"},
+    "ask_ai": {"question": "Hello?"},
+    "analyze_sensor_with_ai": {"ir_value": 1, "context": "Doorway"},
+    "smart_led_control": {"scenario": "Light the doorway when someone is there"},
+}
+
+
+class FakeArduino:
+    is_open = True
+    timeout = 0.2
+
+
+class FakeContent:
+    def __init__(self, role, text):
+        self.role = role
+        self.text = text
+
+
+class FakeCandidate:
+    def __init__(self, text):
+        self.content = FakeContent("model", text)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.candidates = [FakeCandidate(text)]
+
+
+DECISION = "LED:ON because an object is present"
+
+
+class FakeChat:
+    def __init__(self):
+        self.history = []
+        self.sent = []
+
+    async def send_message_async(self, prompt):
+        self.sent.append(prompt)
+        self.history = [*self.history, {"role": "user", "parts": [prompt]}, FakeContent("model", DECISION)]
+        return FakeResponse(DECISION)
+
+
+class FakeModel:
+    def __init__(self):
+        self.requests = []
+
+    async def generate_content_async(self, contents):
+        self.requests.append(contents)
+        return FakeResponse(DECISION)
+
+
+def make_server():
+    """An ArduinoMCPServer wired to fakes instead of hardware and the Gemini API"""
+    server = main.ArduinoMCPServer.__new__(main.ArduinoMCPServer)
+    server.mcp = main.FastMCP("Arduino AI Controller test")
+    server.arduino = FakeArduino()
+    server.port = "/dev/ttyFAKE"
+    server.baudrate = 115200
+    server._last_ir = None
+    server.chat = FakeChat()
+    server.model = FakeModel()
+
+    async def arduino_send_command(command, expected_response_lines=1, retry_count=3):
+        return [REPLIES[command]], None
+
+    server.arduino_send_command = arduino_send_command
+    server.setup_tools()
+    return server
+
+
+def call_registered(server, name, arguments):
+    """Call a tool the way an MCP client would and decode its JSON result"""
+    content = asyncio.run(server.mcp.call_tool(name, arguments))
+    if isinstance(content, tuple):  # Newer SDKs also return structured output
+        content = content[0]
+    return json.loads(content[0].text)
+
+
+def test_every_tool_is_registered():
+    server = make_server()
+    tools = asyncio.run(server.mcp.list_tools())
+    assert sorted(t.name for t in tools) == sorted(t.__name__ for t in main._TOOLS)
+
+
+@pytest.mark.parametrize("tool", main._TOOLS, ids=lambda t: t.__name__)
+def test_tool_runs(tool):
+    server = make_server()
+    result = call_registered(server, tool.__name__, TOOL_ARGS.get(tool.__name__, {}))
+
+    assert isinstance(result, dict)
+    assert result.get("success", True), result
+
+
+def test_smart_led_control_uses_fresh_reading():
+    server = make_server()
+    server._last_ir = 0
+    result = call_registered(server, "smart_led_control", TOOL_ARGS["smart_led_control"])
+
+    assert result["success"], result
+    assert result["ir_sensor"] == 1
+    assert result["led_action"]["led_state"] == "ON"
+
+
+def test_smart_led_control_keeps_a_matching_guess():
+    server = make_server()
+    server._last_ir = 1
+    result = call_registered(server, "smart_led_control", TOOL_ARGS["smart_led_control"])
+
+    assert result["success"], result
+    # Answered by the stateless guess, then recorded in the chat
+    assert server.chat.sent == []
+    assert len(server.model.requests) == 1
+    assert [turn["role"] if isinstance(turn, dict) else turn.role for turn in server.chat.history] == ["user", "model"]
+
+
+def test_smart_led_control_drops_a_wrong_guess_from_history():
+    server = make_server()
+    server._last_ir = 0
+    call_registered(server, "smart_led_control", TOOL_ARGS["smart_led_control"])
+
+    # Only the real prompt, built from the fresh reading, reaches the chat
+    assert len(server.chat.sent) == 1
+    assert "IR Sensor: 1" in server.chat.sent[0]
+    assert len(server.chat.history) == 2
+
+
+@pytest.mark.parametrize("reply, value", [("1", 1), ("IR:0", 0), ("IR_VALUE: -1", -1), ("ERR 404", None), ("1.5", None)])
+def test_read_ir_sensor_only_accepts_documented_formats(reply, value):
+    server = make_server()
+
+    async def arduino_send_command(command, expected_response_lines=1, retry_count=3):
+        return [reply], None
+
+    server.arduino_send_command = arduino_send_command
+    result = asyncio.run(main.read_ir_sensor(server))
+
+    if value is None:
+        assert not result["success"] and "Could not parse" in result["error"]
+    else:
+        assert result["ir_sensor_value"] == value